@@ -0,0 +1,138 @@
+import asyncio
+
+import click
+from textual.widgets import Input
+
+from trogon import Trogon
+from trogon.trogon import FORM_CACHE_SIZE
+from trogon.widgets.command_tree import CommandTree
+from trogon.widgets.form import CommandForm
+from trogon.widgets.parameter_controls import ParameterControls
+
+# Long enough for the form refresh and form change timers to fire.
+SETTLE = 0.2
+
+
+@click.group()
+@click.option("--name")
+def cli(name):
+    pass
+
+
+# One more command than there are cached forms, so the last one reuses a form.
+for index in range(FORM_CACHE_SIZE + 1):
+    cli.command(f"c{index:02}")(lambda: None)
+
+
+def test_reused_form_does_not_keep_values():
+    async def run():
+        app = Trogon(cli, app_name="cli")
+        async with app.run_test() as pilot:
+            await pilot.pause(SETTLE)
+            await pilot.press("down")
+            await pilot.pause(SETTLE)
+            first_form = app.screen._command_form
+            assert first_form.command_schema.name == "c00"
+
+            name_control = first_form.query_one(ParameterControls)
+            name_control.query_one(Input).value = "LEAKED"
+            await pilot.pause(SETTLE)
+            assert app.post_run_command == ["--name", "LEAKED", "c00"]
+
+            for _ in range(FORM_CACHE_SIZE):
+                await pilot.press("down")
+                await pilot.pause(SETTLE)
+
+            # c00's form was the least recently used, so it's been switched to c16,
+            # with the shared --name option back at its default.
+            form = app.screen._command_form
+            assert form is first_form
+            assert form.command_schema.name == "c16"
+            assert app.post_run_command == ["c16"]
+
+    asyncio.run(run())
+
+
+def test_revisited_command_reuses_its_form():
+    async def run():
+        app = Trogon(cli, app_name="cli")
+        async with app.run_test() as pilot:
+            await pilot.pause(SETTLE)
+            await pilot.press("down")
+            await pilot.pause(SETTLE)
+            first_form = app.screen._command_form
+            first_form.query_one(ParameterControls).query_one(Input).value = "KEPT"
+            await pilot.pause(SETTLE)
+
+            await pilot.press("down")
+            await pilot.pause(SETTLE)
+            assert app.screen._command_form is not first_form
+            assert app.post_run_command == ["c01"]
+
+            # Going back shows the same form, values and all, and updates the preview.
+            await pilot.press("up")
+            await pilot.pause(SETTLE)
+            assert app.screen._command_form is first_form
+            assert app.post_run_command == ["--name", "KEPT", "c00"]
+
+    asyncio.run(run())
+
+
+def test_close_and_run_straight_after_cursor_move():
+    async def run():
+        app = Trogon(cli, app_name="cli")
+        async with app.run_test() as pilot:
+            await pilot.pause(SETTLE)
+            # No pause, so the form for the highlighted command isn't shown yet.
+            await pilot.press("down", "down", "ctrl+r")
+        assert app.execute_on_exit
+        assert app.post_run_command == ["c01"]
+
+    asyncio.run(run())
+
+
+def _start_refresh(screen, node):
+    """Highlight a node and start refreshing the form for it straight away,
+    as its timer firing would."""
+    screen._pending_form_refresh_node = node
+    return asyncio.create_task(screen._refresh_command_form(node))
+
+
+def test_overlapping_form_refreshes_show_one_form():
+    async def run():
+        app = Trogon(cli, app_name="cli")
+        async with app.run_test() as pilot:
+            await pilot.pause(SETTLE)
+            screen = app.screen
+            c00, c01 = screen.query_one(CommandTree).root.children[0].children[:2]
+
+            first = _start_refresh(screen, c00)
+            # Let the first refresh get part way through mounting its form.
+            await asyncio.sleep(0)
+            second = _start_refresh(screen, c01)
+            await asyncio.gather(first, second)
+            await pilot.pause(SETTLE)
+
+            visible_forms = [form for form in screen.query(CommandForm) if form.display]
+            assert visible_forms == [screen._command_form]
+            assert screen._command_form.command_schema.name == "c01"
+            assert app.post_run_command == ["c01"]
+
+    asyncio.run(run())
+
+
+def test_close_and_run_while_form_is_mounting():
+    async def run():
+        app = Trogon(cli, app_name="cli")
+        async with app.run_test() as pilot:
+            await pilot.pause(SETTLE)
+            screen = app.screen
+            c01 = screen.query_one(CommandTree).root.children[0].children[1]
+
+            refresh = _start_refresh(screen, c01)
+            await asyncio.sleep(0)
+            await screen.action_close_and_run()
+            await refresh
+        assert app.post_run_command == ["c01"]
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+import click
+
+from trogon.introspect import introspect_click_app, CommandName
+
+
+@click.group()
+@click.option("--verbose", is_flag=True)
+def cli(verbose):
+    pass
+
+
+@cli.command()
+@click.argument("name")
+def hello(name):
+    pass
+
+
+@cli.command()
+def goodbye():
+    pass
+
+
+@click.command()
+@click.option("--count", type=int, default=1)
+def single(count):
+    pass
+
+
+def test_introspect_group_only_has_root():
+    schemas = introspect_click_app(cli)
+    assert list(schemas) == [CommandName("root")]
+    root = schemas[CommandName("root")]
+    assert root.is_group
+    assert list(root.subcommands) == [CommandName("goodbye"), CommandName("hello")]
+    assert root.subcommands[CommandName("hello")].parent is root
+
+
+def test_path_from_root():
+    root = introspect_click_app(cli)[CommandName("root")]
+    hello = root.subcommands[CommandName("hello")]
+    assert hello.path_from_root == [root, hello]
+    assert root.path_from_root == [root]
+    assert hello.path_string == "root ➜ hello"
+
+
+def test_introspect_single_command():
+    schemas = introspect_click_app(single)
+    assert list(schemas) == [CommandName("single")]
+    assert not schemas[CommandName("single")].is_group
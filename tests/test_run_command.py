@@ -8,6 +8,7 @@ from trogon.introspect import (
     CommandName, MultiValueParamData,
 )
 from trogon.run_command import UserCommandData, UserOptionData, UserArgumentData
+from trogon.widgets.parameter_controls import ValueNotSupplied, VALUE_NOT_SUPPLIED
 
 
 @pytest.fixture
@@ -110,3 +111,106 @@ def test_to_cli_string_with_subcommand(user_command_data_with_subcommand):
     cli_string = user_command_data_with_subcommand.to_cli_string(True)
 
     assert cli_string.plain == "test --option1 value1 --option2 42 123 sub --sub-option True"
+
+
+def test_to_cli_args_omits_default_values():
+    option_schema = OptionSchema(
+        name=["--count", "-c"],
+        type=click.INT,
+        default=MultiValueParamData([(1,)]),
+    )
+    user_command_data = UserCommandData(
+        name=CommandName("test"),
+        options=[
+            UserOptionData(name=["--count", "-c"], value=("1",), option_schema=option_schema),
+        ],
+    )
+    assert user_command_data.to_cli_args(True) == ["test"]
+
+
+def test_to_cli_args_multiple_option():
+    option_schema = OptionSchema(
+        name=["--tag", "-t"],
+        type=click.STRING,
+        multiple=True,
+        default=MultiValueParamData([("a",)]),
+    )
+    user_command_data = UserCommandData(
+        name=CommandName("test"),
+        options=[
+            UserOptionData(name=["--tag", "-t"], value=("a",), option_schema=option_schema),
+            UserOptionData(name=["--tag", "-t"], value=("b",), option_schema=option_schema),
+        ],
+    )
+    assert user_command_data.to_cli_args(True) == ["test", "--tag", "a", "--tag", "b"]
+
+
+def test_value_not_supplied_is_singleton():
+    assert ValueNotSupplied() is VALUE_NOT_SUPPLIED
+    assert not VALUE_NOT_SUPPLIED
+
+
+def test_to_cli_string_skips_missing_values():
+    user_command_data = UserCommandData(
+        name=CommandName("test"),
+        options=[
+            UserOptionData(name="--name", value=(ValueNotSupplied(),),
+                           option_schema=OptionSchema(name=["--name"], type=click.STRING)),
+        ],
+        arguments=[
+            UserArgumentData(name="arg1", value=(ValueNotSupplied(),), argument_schema=ArgumentSchema("arg1", click.INT)),
+        ],
+    )
+    assert user_command_data.to_cli_string(True).plain == "test"
+
+
+def test_to_cli_args_flag_and_counting_names():
+    flag_schema = OptionSchema(
+        name=["--color", "-c"],
+        type=click.BOOL,
+        is_flag=True,
+        secondary_opts=["--no-color"],
+        default=MultiValueParamData([(True,)]),
+    )
+    count_schema = OptionSchema(
+        name=["--verbose", "-v"],
+        type=click.INT,
+        counting=True,
+        default=MultiValueParamData([(0,)]),
+    )
+    user_command_data = UserCommandData(
+        name=CommandName("test"),
+        options=[
+            UserOptionData(name=flag_schema.name, value=(False,), option_schema=flag_schema),
+            UserOptionData(name=count_schema.name, value=("3",), option_schema=count_schema),
+        ],
+    )
+    assert user_command_data.to_cli_args(True) == ["test", "--no-color", "-vvv"]
+
+
+def test_to_cli_args_returns_independent_lists():
+    user_command_data = UserCommandData(
+        name=CommandName("test"),
+        arguments=[
+            UserArgumentData(name="arg1", value=("1",), argument_schema=ArgumentSchema("arg1", click.INT)),
+        ],
+    )
+    args = user_command_data.to_cli_args(True)
+    args.append("extra")
+    assert user_command_data.to_cli_args(True) == ["test", "1"]
+    assert user_command_data.to_cli_args() == ["1"]
+
+
+def test_to_cli_args_stringifies_values():
+    option_schema = OptionSchema(name=["--level"], type=click.INT, multiple=True)
+    user_command_data = UserCommandData(
+        name=CommandName("test"),
+        options=[
+            UserOptionData(name="--level", value=(2,), option_schema=option_schema),
+        ],
+        arguments=[
+            UserArgumentData(name="arg1", value=(True,), argument_schema=ArgumentSchema("arg1", click.BOOL)),
+            UserArgumentData(name="arg2", value=(7,), argument_schema=ArgumentSchema("arg2", click.INT)),
+        ],
+    )
+    assert user_command_data.to_cli_args(True) == ["test", "--level", "2", "True", "7"]
@@ -47,7 +47,8 @@ def detect_run_string(_main: ModuleType = sys.modules["__main__"]) -> str:
     # Rewritten by Python from "-m script" to "/path/to/script.py".
     # Need to look at main module to determine how it was executed.
     py_module = _main.__package__
-    name = os.path.splitext(os.path.basename(path))[0]
+    base_name = os.path.basename(path)
+    name = base_name.rpartition(".")[0] or base_name
 
     # A submodule like "example.cli".
     if name != "__main__":
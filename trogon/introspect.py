@@ -1,27 +1,43 @@
 from __future__ import annotations
 
-import uuid
+import itertools
 from dataclasses import dataclass, field
-from typing import Any, Callable, Sequence, NewType
+from functools import cached_property
+from typing import Any, Callable, ClassVar, Sequence, NewType
 
 import click
 from click import BaseCommand, ParamType
+from rich.text import Text
 
+_id_counter = itertools.count()
 
-def generate_unique_id():
-    return f"id_{str(uuid.uuid4())[:8]}"
+
+def generate_unique_id() -> str:
+    # Keys only need to be unique within this process (they're used as widget
+    # IDs), so a counter does the job without the cost of uuid4.
+    return f"id_{next(_id_counter):08x}"
 
 
 @dataclass
 class MultiValueParamData:
+    # Instances returned by process_cli_option may be shared, so they
+    # must not be mutated after construction.
+    __slots__ = ("values",)
+
     values: list[tuple[int | float | str]]
 
+    _EMPTY: ClassVar[MultiValueParamData]
+    _EMPTY_TUPLE: ClassVar[MultiValueParamData]
+
     @staticmethod
     def process_cli_option(value) -> "MultiValueParamData":
         if value is None:
-            value = MultiValueParamData([])
+            value = MultiValueParamData._EMPTY
         elif isinstance(value, tuple):
-            value = MultiValueParamData([value])
+            if not value:
+                value = MultiValueParamData._EMPTY_TUPLE
+            else:
+                value = MultiValueParamData([value])
         elif isinstance(value, list):
             processed_list = [
                 (item,) if not isinstance(item, tuple) else item for item in value
@@ -33,6 +49,10 @@ class MultiValueParamData:
         return value
 
 
+MultiValueParamData._EMPTY = MultiValueParamData([])
+MultiValueParamData._EMPTY_TUPLE = MultiValueParamData([()])
+
+
 @dataclass
 class OptionSchema:
     name: list[str]
@@ -51,9 +71,35 @@ class OptionSchema:
     multiple: bool = False
     multi_value: bool = False
     nargs: int = 1
+    preferred_long_name: str | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    preferred_short_name: str | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    preferred_secondary_name: str | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    default_signature: list[str] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
 
     def __post_init__(self):
         self.multi_value = isinstance(self.type, click.Tuple)
+        if self.default is not None:
+            # The sorted, stringified default values. User input is compared
+            # against this to decide whether an option needs to be emitted.
+            self.default_signature = sorted(
+                str(value)
+                for value in itertools.chain.from_iterable(self.default.values)
+            )
+        if self.name:
+            # The longest name is probably the most descriptive (--verbose over -v),
+            # but counting options read better with the shortest (-vvv).
+            self.preferred_long_name = max(self.name, key=len)
+            self.preferred_short_name = min(self.name, key=len)
+        if self.secondary_opts:
+            self.preferred_secondary_name = max(self.secondary_opts, key=len)
 
 
 @dataclass
@@ -79,17 +125,85 @@ class CommandSchema:
     subcommands: dict["CommandName", "CommandSchema"] = field(default_factory=dict)
     parent: "CommandSchema | None" = None
     is_group: bool = False
+    tree_label: Text | None = field(default=None, repr=False, compare=False)
 
-    @property
+    @cached_property
     def path_from_root(self) -> list["CommandSchema"]:
+        # The parent chain doesn't change after introspection, so the path
+        # only needs to be walked once.
         node = self
-        path: list[CommandSchema] = [self]
-        while True:
-            node = node.parent
-            if node is None:
-                break
+        path: list[CommandSchema] = []
+        while node is not None:
             path.append(node)
-        return list(reversed(path))
+            node = node.parent
+        path.reverse()
+        return path
+
+    @cached_property
+    def path_string(self) -> str:
+        """The names of the commands from the root to this one, for display."""
+        return " ➜ ".join(command.name for command in self.path_from_root)
+
+
+def _process_command(
+    cmd_name: CommandName,
+    cmd_obj: click.Command,
+    parent: CommandSchema | None = None,
+) -> CommandSchema:
+    """Build the schema for a single command, recursing into subcommands if
+    the command is a group."""
+    cmd_data = CommandSchema(
+        name=cmd_name,
+        docstring=cmd_obj.help,
+        function=cmd_obj.callback,
+        options=[],
+        arguments=[],
+        subcommands={},
+        parent=parent,
+        is_group=isinstance(cmd_obj, click.Group),
+    )
+
+    for param in cmd_obj.params:
+        default = MultiValueParamData.process_cli_option(param.default)
+        choices = param.type.choices if isinstance(param.type, click.Choice) else None
+        if isinstance(param, (click.Option, click.core.Group)):
+            option_data = OptionSchema(
+                name=param.opts,
+                type=param.type,
+                is_flag=param.is_flag,
+                is_boolean_flag=param.is_bool_flag,
+                flag_value=param.flag_value,
+                counting=param.count,
+                opts=param.opts,
+                secondary_opts=param.secondary_opts,
+                required=param.required,
+                default=default,
+                help=param.help,
+                multiple=param.multiple,
+                nargs=param.nargs,
+                choices=choices,
+            )
+            cmd_data.options.append(option_data)
+        elif isinstance(param, click.Argument):
+            argument_data = ArgumentSchema(
+                name=param.name,
+                type=param.type,
+                required=param.required,
+                multiple=param.multiple,
+                default=default,
+                nargs=param.nargs,
+                choices=choices,
+            )
+            cmd_data.arguments.append(argument_data)
+
+    if isinstance(cmd_obj, click.core.Group) and cmd_obj.commands:
+        # Store subcommands sorted by name, since that's how they're displayed.
+        for subcmd_name, subcmd_obj in sorted(cmd_obj.commands.items()):
+            cmd_data.subcommands[CommandName(subcmd_name)] = _process_command(
+                CommandName(subcmd_name), subcmd_obj, parent=cmd_data
+            )
+
+    return cmd_data
 
 
 def introspect_click_app(app: BaseCommand) -> dict[CommandName, CommandSchema]:
@@ -112,78 +226,16 @@ def introspect_click_app(app: BaseCommand) -> dict[CommandName, CommandSchema]:
         TypedDicts (OptionData and ArgumentData).
     """
 
-    def process_command(
-        cmd_name: CommandName, cmd_obj: click.Command, parent=None
-    ) -> CommandSchema:
-        cmd_data = CommandSchema(
-            name=cmd_name,
-            docstring=cmd_obj.help,
-            function=cmd_obj.callback,
-            options=[],
-            arguments=[],
-            subcommands={},
-            parent=parent,
-            is_group=isinstance(cmd_obj, click.Group),
-        )
-
-        for param in cmd_obj.params:
-            default = MultiValueParamData.process_cli_option(param.default)
-            if isinstance(param, (click.Option, click.core.Group)):
-                option_data = OptionSchema(
-                    name=param.opts,
-                    type=param.type,
-                    is_flag=param.is_flag,
-                    is_boolean_flag=param.is_bool_flag,
-                    flag_value=param.flag_value,
-                    counting=param.count,
-                    opts=param.opts,
-                    secondary_opts=param.secondary_opts,
-                    required=param.required,
-                    default=default,
-                    help=param.help,
-                    multiple=param.multiple,
-                    nargs=param.nargs,
-                )
-                if isinstance(param.type, click.Choice):
-                    option_data.choices = param.type.choices
-                cmd_data.options.append(option_data)
-            elif isinstance(param, click.Argument):
-                argument_data = ArgumentSchema(
-                    name=param.name,
-                    type=param.type,
-                    required=param.required,
-                    multiple=param.multiple,
-                    default=default,
-                    nargs=param.nargs,
-                )
-                if isinstance(param.type, click.Choice):
-                    argument_data.choices = param.type.choices
-                cmd_data.arguments.append(argument_data)
-
-        if isinstance(cmd_obj, click.core.Group):
-            for subcmd_name, subcmd_obj in cmd_obj.commands.items():
-                cmd_data.subcommands[CommandName(subcmd_name)] = process_command(
-                    CommandName(subcmd_name), subcmd_obj, parent=cmd_data
-                )
-
-        return cmd_data
-
     data: dict[CommandName, CommandSchema] = {}
 
-    # Special case for the root group
+    # Special case for the root group: its subcommands are reached
+    # through the recursion in _process_command.
     if isinstance(app, click.Group):
         root_cmd_name = CommandName("root")
-        data[root_cmd_name] = process_command(root_cmd_name, app)
-        app = data[root_cmd_name]
-
-    if isinstance(app, click.Group):
-        for cmd_name, cmd_obj in app.commands.items():
-            data[CommandName(cmd_name)] = process_command(
-                CommandName(cmd_name), cmd_obj
-            )
+        data[root_cmd_name] = _process_command(root_cmd_name, app)
     elif isinstance(app, click.Command):
         cmd_name = CommandName(app.name)
-        data[cmd_name] = process_command(cmd_name, app)
+        data[cmd_name] = _process_command(cmd_name, app)
 
     return data
 
@@ -2,9 +2,8 @@ from __future__ import annotations
 
 import itertools
 import shlex
-from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Any, List, Optional
+from typing import Any, Iterator, List, Optional
 
 from rich.text import Text
 
@@ -15,7 +14,7 @@ from trogon.introspect import (
     ArgumentSchema,
     MultiValueParamData,
 )
-from trogon.widgets.parameter_controls import ValueNotSupplied
+from trogon.widgets.parameter_controls import VALUE_NOT_SUPPLIED
 
 
 @dataclass
@@ -29,6 +28,8 @@ class UserOptionData:
         option_schema: The schema corresponding to this option.
     """
 
+    __slots__ = ("name", "value", "option_schema")
+
     name: str | list[str]
     value: tuple[Any]  # Multi-value options will be tuple length > 1
     option_schema: OptionSchema
@@ -52,6 +53,8 @@ class UserArgumentData:
         argument_schema: The schema corresponding to this argument.
     """
 
+    __slots__ = ("name", "value", "argument_schema")
+
     name: str
     value: tuple[Any]
     argument_schema: ArgumentSchema
@@ -76,6 +79,12 @@ class UserCommandData:
     subcommand: UserCommandData | None = None
     parent: UserCommandData | None = None
     command_schema: CommandSchema | None = None
+    # The screen and the app each need the arguments for the same command data,
+    # so they're generated once. Command data is rebuilt (not modified) whenever
+    # the form changes, so the cached arguments never go stale.
+    _cli_args: list[str] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def to_cli_args(self, include_root_command: bool = False) -> list[str]:
         """
@@ -84,139 +93,146 @@ class UserCommandData:
         Returns:
             A list of strings that can be passed to subprocess.run to execute the command.
         """
-        cli_args = self._to_cli_args()
+        cli_args = self._cli_args
+        if cli_args is None:
+            cli_args = self._cli_args = self._to_cli_args()
         if not include_root_command:
-            cli_args = cli_args[1:]
+            return cli_args[1:]
 
-        return cli_args
+        return cli_args.copy()
 
     def _to_cli_args(self) -> list[str]:
-        args: list[str] = [self.name]
+        return list(self._iter_cli_args())
+
+    def _iter_cli_args(self) -> Iterator[str]:
+        """Yield the arguments for this command, followed by those of its subcommands."""
+        # Walk the chain of subcommands rather than recursing into each one.
+        node: UserCommandData | None = self
+        while node is not None:
+            yield from node._iter_command_args()
+            node = node.subcommand
 
-        multiples: dict[str, list[tuple[str]]] = defaultdict(list)
-        multiples_schemas: dict[str, OptionSchema] = {}
+    def _iter_command_args(self) -> Iterator[str]:
+        """Yield the arguments for this command only (excluding its subcommands)."""
+        yield self.name
+
+        multiples: dict[str, tuple[OptionSchema, list[tuple[str]]]] = {}
 
         for option in self.options:
-            if option.option_schema.multiple:
+            schema = option.option_schema
+            value = option.value
+            if schema.multiple:
                 # We need to gather the items for the same option,
                 #  compare them to the default, then display them all
                 #  if they aren't equivalent to the default.
-                multiples[option.string_name].append(option.value)
-                multiples_schemas[option.string_name] = option.option_schema
+                string_name = option.string_name
+                multiple = multiples.get(string_name)
+                if multiple is None:
+                    multiples[string_name] = (schema, [value])
+                else:
+                    multiple[1].append(value)
             else:
-                value_data: list[tuple[Any]] = MultiValueParamData.process_cli_option(
-                    option.value
-                ).values
-
-                if option.option_schema.default is not None:
-                    default_data: list[tuple[Any]] = option.option_schema.default.values
+                # Values coming from the form are always tuples, so skip
+                # wrapping them in a MultiValueParamData just to unwrap it.
+                if isinstance(value, tuple):
+                    value_data: list[tuple[Any]] = [value]
                 else:
-                    default_data = [tuple()]
-
-                flattened_values = sorted(itertools.chain.from_iterable(value_data))
-                flattened_defaults = sorted(itertools.chain.from_iterable(default_data))
-
-                # If the user has supplied values (any values are not None), then
-                # we don't display the value.
-                values_supplied = any(
-                    value != ValueNotSupplied() for value in flattened_values
-                )
-                values_are_defaults = list(map(str, flattened_values)) == list(
-                    map(str, flattened_defaults)
-                )
-
-                # If the user has supplied values, and they're not the default values,
-                # then we want to display them in the command string...
-                if values_supplied and not values_are_defaults:
-                    if isinstance(option.name, str):
-                        option_name = option.name
+                    value_data = MultiValueParamData.process_cli_option(value).values
+
+                # Stringify the values once, so the same strings are used for
+                # the comparison with the defaults and in the emitted args.
+                # Missing values are kept as-is so they can be marked later.
+                flattened_values = [
+                    value if value is VALUE_NOT_SUPPLIED else str(value)
+                    for value in itertools.chain.from_iterable(value_data)
+                ]
+
+                # Most options are left at their defaults, and there's nothing
+                # to display for them, so check for that first.
+                if (
+                    sorted(str(value) for value in flattened_values)
+                    == schema.default_signature
+                ):
+                    continue
+
+                # If the user hasn't supplied any values, there's nothing to
+                # display either.
+                if all(value is VALUE_NOT_SUPPLIED for value in flattened_values):
+                    continue
+
+                # The user has supplied values, and they're not the default values,
+                # so we want to display them in the command string...
+                is_counting = schema.counting
+                if isinstance(option.name, str):
+                    option_name = option.name
+                else:
+                    if is_counting:
+                        # For count options, we use the shortest name, e.g. use
+                        # -v instead of --verbose.
+                        option_name = schema.preferred_short_name
                     else:
-                        if option.option_schema.counting:
-                            # For count options, we use the shortest name, e.g. use
-                            # -v instead of --verbose.
-                            option_name = min(option.name, key=len)
-                        else:
-                            # Use the option with the longest name, since
-                            # it's probably the most descriptive (use --verbose over -v)
-                            option_name = max(option.name, key=len)
-
-                    is_true_bool = value_data == [(True,)]
-
-                    is_flag = option.option_schema.is_flag
-                    secondary_opts = option.option_schema.secondary_opts
-
-                    if is_flag:
-                        # If the option is specified like `--thing/--not-thing`,
-                        # then secondary_opts will contain `--not-thing`, and if the
-                        # value is False, we should use that.
-                        if is_true_bool:
-                            args.append(option_name)
-                        else:
-                            if secondary_opts:
-                                longest_secondary_name = max(secondary_opts, key=len)
-                                args.append(longest_secondary_name)
+                        # Use the option with the longest name, since
+                        # it's probably the most descriptive (use --verbose over -v)
+                        option_name = schema.preferred_long_name
+
+                if schema.is_flag:
+                    # If the option is specified like `--thing/--not-thing`,
+                    # then secondary_opts will contain `--not-thing`, and if the
+                    # value is False, we should use that.
+                    if value_data == [(True,)]:
+                        yield option_name
+                    else:
+                        if schema.secondary_opts:
+                            yield schema.preferred_secondary_name
+                else:
+                    if not is_counting:
+                        # Although buried away a little, this branch here is
+                        # actually the nominal case... single value options e.g.
+                        # `--foo bar`.
+                        yield option_name
+                        yield from flattened_values
                     else:
-                        if not option.option_schema.counting:
-                            # Although buried away a little, this branch here is
-                            # actually the nominal case... single value options e.g.
-                            # `--foo bar`.
-                            args.append(option_name)
-                            for subvalue_tuple in value_data:
-                                args.extend(subvalue_tuple)
+                        # Get the value of the counting option
+                        count = next(itertools.chain.from_iterable(value_data), 1)
+                        try:
+                            count = int(count)
+                        except ValueError:
+                            # TODO: Not sure if this is the right thing to do
+                            count = 1
+                        count = max(1, min(count, 5))
+                        if option_name.startswith("--"):
+                            yield from [option_name] * count
                         else:
-                            # Get the value of the counting option
-                            count = next(itertools.chain.from_iterable(value_data), 1)
-                            try:
-                                count = int(count)
-                            except ValueError:
-                                # TODO: Not sure if this is the right thing to do
-                                count = 1
-                            count = max(1, min(count, 5))
-                            if option_name.startswith("--"):
-                                args.extend([option_name] * count)
-                            else:
-                                clean_option_name = option_name.lstrip("-")
-                                args.append(f"-{clean_option_name * count}")
-
-        for option_name, values in multiples.items():
+                            clean_option_name = option_name.lstrip("-")
+                            yield f"-{clean_option_name * count}"
+
+        for option_name, (option_schema, values) in multiples.items():
             # Check if the values given for this option differ from the default
-            defaults = multiples_schemas[option_name].default or []
-            default_values = list(itertools.chain.from_iterable(defaults.values))
-            supplied_defaults = [
-                value for value in default_values if value != ValueNotSupplied()
-            ]
-            supplied_defaults = list(map(str, supplied_defaults))
-            supplied_defaults = sorted(supplied_defaults)
-
-            supplied_values = list(itertools.chain.from_iterable(values))
-            supplied_values = [
-                value for value in supplied_values if value != ValueNotSupplied()
-            ]
-            supplied_values = list(map(str, supplied_values))
-            supplied_values = sorted(supplied_values)
+            supplied_defaults = option_schema.default_signature
+            supplied_values = sorted(
+                str(value)
+                for value in itertools.chain.from_iterable(values)
+                if value is not VALUE_NOT_SUPPLIED
+            )
 
+            # Missing values were filtered out above, so anything left was supplied.
+            values_supplied = bool(supplied_values)
             values_are_defaults = supplied_values == supplied_defaults
-            values_supplied = any(
-                value != ValueNotSupplied() for value in supplied_values
-            )
 
             # If the user has supplied any non-default values, include them...
             if values_supplied and not values_are_defaults:
                 for value_data in values:
-                    if not all(value == ValueNotSupplied() for value in value_data):
-                        args.append(option_name)
-                        args.extend(v for v in value_data)
+                    if not all(value is VALUE_NOT_SUPPLIED for value in value_data):
+                        yield option_name
+                        yield from (
+                            value if value is VALUE_NOT_SUPPLIED else str(value)
+                            for value in value_data
+                        )
 
         for argument in self.arguments:
-            this_arg_values = argument.value
-            for argument_value in this_arg_values:
-                if argument_value != ValueNotSupplied():
-                    args.append(argument_value)
-
-        if self.subcommand:
-            args.extend(self.subcommand._to_cli_args())
-
-        return args
+            for value in argument.value:
+                if value is not VALUE_NOT_SUPPLIED:
+                    yield str(value)
 
     def to_cli_string(self, include_root_command: bool = False) -> Text:
         """
@@ -228,11 +244,17 @@ class UserCommandData:
         """
         args = self.to_cli_args(include_root_command=include_root_command)
 
-        text_renderables: list[Text] = []
-        for arg in args:
-            text_renderables.append(
-                Text(shlex.quote(str(arg)))
-                if arg != ValueNotSupplied()
-                else Text("???", style="bold black on red")
-            )
-        return Text(" ").join(text_renderables)
+        # Only missing values need styling, so in the common case the whole
+        # command can be built as a single plain string.
+        if not any(arg is VALUE_NOT_SUPPLIED for arg in args):
+            return Text(shlex.join(str(arg) for arg in args))
+
+        cli_string = Text()
+        for index, arg in enumerate(args):
+            if index:
+                cli_string.append(" ")
+            if arg is VALUE_NOT_SUPPLIED:
+                cli_string.append("???", style="bold black on red")
+            else:
+                cli_string.append(shlex.quote(str(arg)))
+        return cli_string
@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import re
 import shlex
+from collections import OrderedDict
+from functools import partial
 from importlib import metadata  # type: ignore
 from pathlib import Path
 from typing import Any
+from weakref import WeakKeyDictionary
 from webbrowser import open as open_url
 
 import click
 from rich.console import Console
-from rich.highlighter import ReprHighlighter
+from rich.highlighter import Highlighter
+from rich.style import Style
 from rich.text import Text
 from textual import log, events, on
 from textual.app import ComposeResult, App, AutopilotCallbackType
@@ -17,6 +23,7 @@ from textual.binding import Binding
 from textual.containers import Vertical, Horizontal, VerticalScroll
 from textual.css.query import NoMatches
 from textual.screen import Screen
+from textual.timer import Timer
 from textual.widgets import (
     Tree,
     Label,
@@ -38,6 +45,66 @@ from trogon.widgets.command_tree import CommandTree
 from trogon.widgets.form import CommandForm
 from trogon.widgets.multiple_choice import NonFocusableVerticalScroll
 
+FORM_REFRESH_DELAY = 0.05
+"""Seconds to wait after the command tree highlight changes before rebuilding the form."""
+
+FORM_CACHE_SIZE = 16
+"""The maximum number of command forms kept mounted (but hidden) for reuse."""
+
+# Introspecting a large CLI is expensive, and the result never changes for a
+# given command object, so it's only done once per CLI.
+_SCHEMA_CACHE: WeakKeyDictionary[
+    click.BaseCommand, dict[CommandName, CommandSchema]
+] = WeakKeyDictionary()
+
+# Looking up a distribution's version searches sys.path and parses metadata
+# files, so it's only done once per name.
+_VERSION_CACHE: dict[str, str | None] = {}
+
+
+def _get_version(name: str) -> str | None:
+    """Return the installed version of the named distribution, or None if it
+    can't be found."""
+    try:
+        return _VERSION_CACHE[name]
+    except KeyError:
+        pass
+    try:
+        version = metadata.version(name)
+    except Exception:
+        version = None
+    _VERSION_CACHE[name] = version
+    return version
+
+
+class CommandStringHighlighter(Highlighter):
+    """Highlights the options, quoted strings and numbers in a command string.
+
+    Command strings are simple enough that a single pass with one pattern is all
+    that's needed, which is much cheaper than Rich's general purpose highlighters.
+    """
+
+    _TOKENS = re.compile(
+        r"(?P<flag>(?<![\w-])--?[\w-]+)"
+        r"|(?P<str>\"[^\"]*\"|'[^']*')"
+        r"|(?P<number>\b\d+(?:\.\d+)?\b)"
+    )
+    _STYLES = {
+        "flag": "repr.attrib_name",
+        "str": "repr.str",
+        "number": "repr.number",
+    }
+
+    def highlight(self, text: Text) -> None:
+        styles = self._STYLES
+        stylize = text.stylize
+        for match in self._TOKENS.finditer(text.plain):
+            stylize(styles[match.lastgroup], *match.span())
+
+
+# The highlighter holds no state, so every screen can share the same one.
+_HIGHLIGHTER = CommandStringHighlighter()
+
 
 class CommandBuilder(Screen[None]):
     COMPONENT_CLASSES = {"version-string", "prompt", "command-name-syntax"}
@@ -52,7 +119,7 @@ class CommandBuilder(Screen[None]):
         Binding(
             key="ctrl+o", action="app.show_command_info", description="Command Info"
         ),
-        Binding(key="ctrl+s", action="app.focus('search')", description="Search"),
+        Binding(key="ctrl+s", action="focus_search", description="Search"),
         Binding(key="f1", action="about", description="About"),
     ]
 
@@ -69,16 +136,25 @@ class CommandBuilder(Screen[None]):
         self.command_data: UserCommandData = UserCommandData(CommandName("_default"))
         self.cli = cli
         self.is_grouped_cli = isinstance(cli, click.Group)
-        self.command_schemas = introspect_click_app(cli)
+        command_schemas = _SCHEMA_CACHE.get(cli)
+        if command_schemas is None:
+            command_schemas = _SCHEMA_CACHE[cli] = introspect_click_app(cli)
+        self.command_schemas = command_schemas
         self.click_app_name = click_app_name
         self.command_name = command_name
 
-        try:
-            self.version = metadata.version(self.click_app_name)
-        except Exception:
-            self.version = None
+        self.version = _get_version(self.click_app_name)
 
-        self.highlighter = ReprHighlighter()
+        self.highlighter = _HIGHLIGHTER
+        self._pending_form_refresh: Timer | None = None
+        self._pending_form_refresh_node: TreeNode[CommandSchema] | None = None
+        # Refreshes run from timers rather than the message queue, so this stops
+        # one from starting while another is still mounting a form.
+        self._form_refresh_lock = asyncio.Lock()
+        self._form_cache: OrderedDict[str, CommandForm] = OrderedDict()
+        self._command_form: CommandForm | None = None
+        self._last_preview_value: str | None = None
+        self._preview_styles: tuple[Style, Style] | None = None
 
     def compose(self) -> ComposeResult:
         tree = CommandTree("Commands", self.command_schemas, self.command_name)
@@ -111,10 +187,7 @@ class CommandBuilder(Screen[None]):
                 vs.can_focus = False
                 yield Static(self.click_app_name or "", id="home-command-description")
 
-            scrollable_body = VerticalScroll(
-                Static(""),
-                id="home-body-scroll",
-            )
+            scrollable_body = VerticalScroll(id="home-body-scroll")
             scrollable_body.can_focus = False
             yield scrollable_body
             yield Horizontal(
@@ -131,24 +204,50 @@ class CommandBuilder(Screen[None]):
 
         yield Footer()
 
-    def action_close_and_run(self) -> None:
+    async def action_close_and_run(self) -> None:
+        # The form for a newly highlighted command may not have been shown yet, in
+        # which case it has to be, so that it's the highlighted command that runs.
+        if self._pending_form_refresh is not None:
+            self._pending_form_refresh.stop()
+            await self._refresh_command_form(self._pending_form_refresh_node)
+        # A refresh which had already started may still be mounting the form, so
+        # wait for it to finish before reading the form.
+        async with self._form_refresh_lock:
+            # Changes to the form are gathered for a moment before they're handled,
+            # so make sure the latest ones are included in the command that's run.
+            if self._command_form is not None:
+                self.command_data = self._command_form.flush_pending_changes()
+                self.app.set_command_to_run(self.command_data)
         self.app.execute_on_exit = True
         self.app.exit()
 
+    def action_focus_search(self) -> None:
+        # Hidden forms have search inputs too, so only look in the visible one.
+        if self._command_form is not None:
+            self._command_form.query_one("#search").focus()
+
     def action_about(self) -> None:
         from .widgets.about import AboutDialog
 
         self.app.push_screen(AboutDialog())
 
     async def _refresh_command_form(self, node: TreeNode[CommandSchema]) -> None:
-        selected_command = node.data
-        if selected_command is None:
-            return
-
-        self.selected_command_schema = selected_command
-        self._update_command_description(selected_command)
-        self._update_execution_string_preview()
-        await self._update_form_body(node)
+        # Stopping the timer now would cancel this refresh part way through.
+        self._pending_form_refresh = None
+        async with self._form_refresh_lock:
+            # The highlight may have moved on while an earlier refresh was running,
+            # in which case only the latest node is worth showing.
+            if node is not self._pending_form_refresh_node:
+                return
+            self._pending_form_refresh_node = None
+            selected_command = node.data
+            if selected_command is None:
+                return
+
+            self.selected_command_schema = selected_command
+            self._update_command_description(selected_command)
+            self._update_execution_string_preview()
+            await self._update_form_body(node)
 
     @on(Tree.NodeHighlighted)
     async def selected_command_changed(
@@ -156,7 +255,14 @@ class CommandBuilder(Screen[None]):
     ) -> None:
         """When we highlight a node in the CommandTree, the main body of the home page updates
         to display a form specific to the highlighted command."""
-        await self._refresh_command_form(event.node)
+        # Building a form is relatively expensive, so wait for the highlight to
+        # settle rather than building one for every node the cursor passes over.
+        if self._pending_form_refresh is not None:
+            self._pending_form_refresh.stop()
+        self._pending_form_refresh_node = event.node
+        self._pending_form_refresh = self.set_timer(
+            FORM_REFRESH_DELAY, partial(self._refresh_command_form, event.node)
+        )
 
     @on(CommandForm.Changed)
     def update_command_data(self, event: CommandForm.Changed) -> None:
@@ -172,28 +278,66 @@ class CommandBuilder(Screen[None]):
         description_text = f"[b]{command.name}[/]\n{description_text}"
         description_box.update(description_text)
 
+    def notify_style_update(self) -> None:
+        super().notify_style_update()
+        self._preview_styles = None
+        self._last_preview_value = None
+
     def _update_execution_string_preview(self) -> None:
         """Update the preview box showing the command string to be executed"""
-        command_name_syntax_style = self.get_component_rich_style("command-name-syntax")
-        prefix = Text(f"{self.click_app_name} ", command_name_syntax_style)
         new_value = self.command_data.to_cli_string(include_root_command=False)
+        # Many form changes (e.g. focus moving between inputs) don't alter the
+        # command string, so skip highlighting and re-rendering in that case.
+        plain_value = new_value.plain
+        if plain_value == self._last_preview_value:
+            return
+        self._last_preview_value = plain_value
+
+        # Resolving component styles walks the CSS, so they're looked up once and
+        # kept until the styles change.
+        if self._preview_styles is None:
+            self._preview_styles = (
+                self.get_component_rich_style("command-name-syntax"),
+                self.get_component_rich_style("prompt"),
+            )
+        command_name_syntax_style, prompt_style = self._preview_styles
+        prefix = Text(f"{self.click_app_name} ", command_name_syntax_style)
         highlighted_new_value = Text.assemble(prefix, self.highlighter(new_value))
-        prompt_style = self.get_component_rich_style("prompt")
         preview_string = Text.assemble(("$ ", prompt_style), highlighted_new_value)
         self.query_one("#home-exec-preview-static", Static).update(preview_string)
 
     async def _update_form_body(self, node: TreeNode[CommandSchema]) -> None:
         # self.query_one(Pretty).update(node.data)
         parent = self.query_one("#home-body-scroll", VerticalScroll)
-        for child in parent.children:
-            await child.remove()
+        if self._command_form is not None:
+            self._command_form.display = False
 
-        # Process the metadata for this command and mount corresponding widgets
+        # Forms are kept around once built, so switching back to a command
+        # just shows its existing form again rather than rebuilding it.
         command_schema = node.data
-        command_form = CommandForm(
-            command_schema=command_schema, command_schemas=self.command_schemas
-        )
-        await parent.mount(command_form)
+        form_cache = self._form_cache
+        command_form = form_cache.get(command_schema.key)
+        if command_form is None and len(form_cache) >= FORM_CACHE_SIZE:
+            # Rather than building a new form, switch the least recently used one
+            # over to this command. Only the parts that differ get rebuilt.
+            _, command_form = form_cache.popitem(last=False)
+            form_cache[command_schema.key] = command_form
+            command_form.display = True
+            await command_form.update_schema(command_schema)
+        elif command_form is None:
+            # Process the metadata for this command and mount corresponding widgets
+            command_form = CommandForm(
+                command_schema=command_schema, command_schemas=self.command_schemas
+            )
+            form_cache[command_schema.key] = command_form
+            await parent.mount(command_form)
+        else:
+            form_cache.move_to_end(command_schema.key)
+            command_form.display = True
+            # The preview is still showing the previous command.
+            command_form.refresh_command_data()
+
+        self._command_form = command_form
         if not self.is_grouped_cli:
             command_form.focus()
 
@@ -248,18 +392,28 @@ class Trogon(App[None]):
                 console = Console()
                 if self.post_run_command and self.execute_on_exit:
                     console.print(
-                        f"Running [b cyan]{self.app_name} {' '.join(shlex.quote(s) for s in self.post_run_command)}[/]"
+                        f"Running [b cyan]{self.app_name} {shlex.join(self.post_run_command)}[/]"
                     )
 
                     split_app_name = shlex.split(self.app_name)
-                    program_name = shlex.split(self.app_name)[0]
                     arguments = [*split_app_name, *self.post_run_command]
-                    os.execvp(program_name, arguments)
+                    os.execvp(split_app_name[0], arguments)
 
     @on(CommandForm.Changed)
     def update_command_to_run(self, event: CommandForm.Changed):
+        # Once the user has chosen to run the command, it's final. Changes from the
+        # form which are still on their way here are older than that.
+        if not self.execute_on_exit:
+            self.set_command_to_run(event.command_data)
+
+    def set_command_to_run(self, command_data: UserCommandData) -> None:
+        """Set the command which is run when the app exits.
+
+        Args:
+            command_data: The data for the command to run.
+        """
         include_root_command = not self.is_grouped_cli
-        self.post_run_command = event.command_data.to_cli_args(include_root_command)
+        self.post_run_command = command_data.to_cli_args(include_root_command)
 
     def action_focus_command_tree(self) -> None:
         try:
@@ -31,8 +31,14 @@ class CommandMetadata(DataTable):
         self.zebra_stripes = True
         self.cursor_type = "none"
         self.command_schema = command_schema
+        self._populated = False
 
-    def on_mount(self) -> None:
+    def on_show(self) -> None:
+        # The metadata tab isn't visible when the modal opens, so the rows
+        # aren't built until the tab is shown for the first time.
+        if self._populated:
+            return
+        self._populated = True
         self.add_columns("Key", "Value")
         schema = self.command_schema
         self.add_rows(
@@ -71,8 +77,7 @@ class CommandInfo(ModalScreen):
 
     def compose(self) -> ComposeResult:
         schema = self.command_schema
-        path = schema.path_from_root
-        path_string = " ➜ ".join(command.name for command in path)
+        path_string = schema.path_string
 
         title_style = self.get_component_rich_style("title")
         subtitle_style = self.get_component_rich_style("subtitle")
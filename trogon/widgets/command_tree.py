@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from rich.style import Style
 from rich.text import TextType, Text
+from textual import on
 from textual.widgets import Tree
 from textual.widgets._tree import TreeNode
 
@@ -32,26 +33,51 @@ class CommandTree(Tree[CommandSchema]):
         return label
 
     def on_mount(self):
-        def build_tree(
-            data: dict[CommandName, CommandSchema], node: TreeNode[CommandSchema]
-        ) -> TreeNode[CommandSchema]:
-            data = {key: data[key] for key in sorted(data)}
+        # Build the tree iteratively, with a stack of (subcommands, parent node) pairs.
+        # Each node's children are still added in order, so the result is the same
+        # as a depth-first recursive build.
+        stack: list[
+            tuple[dict[CommandName, CommandSchema], TreeNode[CommandSchema]]
+        ] = [(self.cli_metadata, self.root)]
+        group_style = self.get_component_rich_style("group")
+        while stack:
+            data, node = stack.pop()
+            add_node = node.add
+            add_leaf = node.add_leaf
             for cmd_name, cmd_data in data.items():
                 if cmd_name == self.command_name:
                     continue
                 if cmd_data.subcommands:
-                    label = Text(cmd_name)
+                    # The label is built once per schema, and copied each time the
+                    # tree is mounted. The group style comes from CSS, so it's
+                    # applied to the copy.
+                    label = cmd_data.tree_label
+                    if label is None:
+                        label = Text(cmd_name)
+                        if cmd_data.is_group:
+                            label.append(" ")
+                            label.append("group", "dim i")
+                        cmd_data.tree_label = label
+                    label = label.copy()
                     if cmd_data.is_group:
-                        group_style = self.get_component_rich_style("group")
-                        label.stylize(group_style)
-                        label.append(" ")
-                        label.append("group", "dim i")
-                    child = node.add(label, allow_expand=False, data=cmd_data)
-                    build_tree(cmd_data.subcommands, child)
+                        label.stylize(group_style, 0, len(cmd_name))
+                    child = add_node(label, allow_expand=False, data=cmd_data)
+                    stack.append((cmd_data.subcommands, child))
                 else:
-                    node.add_leaf(cmd_name, data=cmd_data)
-            return node
+                    add_leaf(cmd_name, data=cmd_data)
 
-        build_tree(self.cli_metadata, self.root)
-        self.root.expand_all()
+        # Only expand the top level up front. Nested groups are expanded as they're
+        # highlighted, so large CLIs don't lay out every command at startup.
+        self.root.expand()
+        for child in self.root.children:
+            child.expand()
         self.select_node(self.root)
+
+    @on(Tree.NodeHighlighted)
+    def expand_highlighted_node(
+        self, event: Tree.NodeHighlighted[CommandSchema]
+    ) -> None:
+        node = event.node
+        # Expanding invalidates the tree, so only do it when it changes something.
+        if node.children and not node.is_expanded:
+            node.expand()
@@ -6,6 +6,7 @@ from textual import on
 from textual.app import ComposeResult
 from textual.containers import VerticalScroll, Vertical
 from textual.message import Message
+from textual.timer import Timer
 from textual.widget import Widget
 from textual.widgets import Label, Input
 
@@ -16,11 +17,19 @@ from trogon.introspect import (
     OptionSchema,
 )
 from trogon.run_command import UserCommandData, UserOptionData, UserArgumentData
-from trogon.widgets.parameter_controls import ParameterControls
+from trogon.widgets.parameter_controls import (
+    ParameterControls,
+    compile_filter_pattern,
+)
+
+FORM_CHANGE_DELAY = 0.05
+"""Seconds to gather changes to a form for before rebuilding its command data."""
 
 
 @dataclasses.dataclass
 class FormControlMeta:
+    __slots__ = ("widget", "meta")
+
     widget: Widget
     meta: OptionSchema | ArgumentSchema
 
@@ -95,10 +104,13 @@ class CommandForm(Widget):
         self.command_schema = command_schema
         self.command_schemas = command_schemas
         self.first_control: ParameterControls | None = None
+        # Controls by the key of their parameter, so the form's values can be
+        # read without querying the DOM on every change.
+        self._controls_by_key: dict[str, ParameterControls] = {}
+        self._last_filter_query = ""
+        self._pending_form_change: Timer | None = None
 
     def compose(self) -> ComposeResult:
-        path_from_root = iter(reversed(self.command_schema.path_from_root))
-        command_node = next(path_from_root)
         with VerticalScroll() as vs:
             vs.can_focus = False
 
@@ -108,92 +120,214 @@ class CommandForm(Widget):
                 id="search",
             )
 
-            while command_node is not None:
-                options = command_node.options
-                arguments = command_node.arguments
-                if options or arguments:
-                    with Vertical(
-                        classes="command-form-command-group", id=command_node.key
-                    ) as v:
-                        is_inherited = command_node is not self.command_schema
-                        v.border_title = (
-                            f"{'↪ ' if is_inherited else ''}{command_node.name}"
-                        )
-                        if is_inherited:
-                            v.border_title += " [dim not bold](inherited)"
-                        if arguments:
-                            yield Label(f"Arguments", classes="command-form-heading")
-                            for argument in arguments:
-                                controls = ParameterControls(argument, id=argument.key)
-                                if self.first_control is None:
-                                    self.first_control = controls
-                                yield controls
-
-                        if options:
-                            yield Label(f"Options", classes="command-form-heading")
-                            for option in options:
-                                controls = ParameterControls(option, id=option.key)
-                                if self.first_control is None:
-                                    self.first_control = controls
-                                yield controls
-
-                command_node = next(path_from_root, None)
+            for command_node in reversed(self.command_schema.path_from_root):
+                command_group = self._make_command_group(command_node)
+                if command_group is not None:
+                    yield command_group
+
+    def _make_command_group(self, command_node: CommandSchema) -> Vertical | None:
+        """Build the group of controls for the options and arguments of a command
+        in the path to the schema of this form.
+
+        Returns:
+            The group, or None if the command has no options or arguments.
+        """
+        options = command_node.options
+        arguments = command_node.arguments
+        if not options and not arguments:
+            return None
+
+        children: list[Widget] = []
+        controls_by_key = self._controls_by_key
+        if arguments:
+            children.append(Label(f"Arguments", classes="command-form-heading"))
+            for argument in arguments:
+                controls = ParameterControls(argument, id=argument.key)
+                controls_by_key[argument.key] = controls
+                if self.first_control is None:
+                    self.first_control = controls
+                children.append(controls)
+
+        if options:
+            children.append(Label(f"Options", classes="command-form-heading"))
+            for option in options:
+                controls = ParameterControls(option, id=option.key)
+                controls_by_key[option.key] = controls
+                if self.first_control is None:
+                    self.first_control = controls
+                children.append(controls)
+
+        command_group = Vertical(
+            *children, classes="command-form-command-group", id=command_node.key
+        )
+        self._update_group_title(command_group, command_node)
+        return command_group
+
+    def _update_group_title(
+        self, command_group: Vertical, command_node: CommandSchema
+    ) -> None:
+        is_inherited = command_node is not self.command_schema
+        command_group.border_title = (
+            f"{'↪ ' if is_inherited else ''}{command_node.name}"
+        )
+        if is_inherited:
+            command_group.border_title += " [dim not bold](inherited)"
+
+    async def update_schema(self, command_schema: CommandSchema) -> None:
+        """Switch this form over to a different command.
+
+        Commands which share ancestors (e.g. siblings in a group) share the
+        groups of inherited options, so only the groups which differ between the
+        old and new command are removed and mounted.
+
+        Args:
+            command_schema: The schema of the command to show in this form.
+        """
+        old_path = self.command_schema.path_from_root
+        self.command_schema = command_schema
+        new_path = command_schema.path_from_root
+        new_keys = {command_node.key for command_node in new_path}
+
+        controls_by_key = self._controls_by_key
+        for command_node in old_path:
+            if command_node.key not in new_keys:
+                for parameter in (*command_node.arguments, *command_node.options):
+                    controls_by_key.pop(parameter.key, None)
+
+        scroll = self.query_one(VerticalScroll)
+        kept_groups: dict[str, Vertical] = {}
+        stale_selectors: list[str] = []
+        for command_group in scroll.query(".command-form-command-group"):
+            if command_group.id in new_keys:
+                kept_groups[command_group.id] = command_group
+            else:
+                stale_selectors.append(f"#{command_group.id}")
+        if stale_selectors:
+            # Remove the stale groups together, rather than waiting on each in turn.
+            await scroll.query(", ".join(stale_selectors)).remove()
+
+        # The kept groups may hold values the user entered for the previous command,
+        # which mustn't carry over to this one.
+        for command_node in new_path:
+            if command_node.key in kept_groups:
+                for parameter in (*command_node.arguments, *command_node.options):
+                    await controls_by_key[parameter.key].reset()
+
+        # Groups are laid out from the selected command up to the root, and shared
+        # ancestors always come last, so new groups go before all of the kept ones.
+        new_groups: list[Vertical] = []
+        first_group: Vertical | None = None
+        for command_node in reversed(new_path):
+            command_group = kept_groups.get(command_node.key)
+            if command_group is None:
+                command_group = self._make_command_group(command_node)
+                if command_group is None:
+                    continue
+                new_groups.append(command_group)
+            else:
+                self._update_group_title(command_group, command_node)
+            if first_group is None:
+                first_group = command_group
+
+        search_input = self.query_one("#search", Input)
+        if new_groups:
+            await scroll.mount_all(new_groups, after=search_input)
+
+        self.first_control = (
+            None
+            if first_group is None
+            else first_group.query(ParameterControls).first()
+        )
+        search_input.value = ""
+        self.refresh_command_data()
 
     def on_mount(self) -> None:
         self._form_changed()
 
     def on_input_changed(self) -> None:
-        self._form_changed()
+        self._schedule_form_changed()
 
     def on_select_changed(self) -> None:
-        self._form_changed()
+        self._schedule_form_changed()
 
     def on_checkbox_changed(self) -> None:
-        self._form_changed()
+        self._schedule_form_changed()
 
     def on_multiple_choice_changed(self) -> None:
+        self._schedule_form_changed()
+
+    def _schedule_form_changed(self) -> None:
+        """Rebuild the command data shortly, unless a rebuild is already due.
+
+        Typing changes the form on every keystroke, so changes arriving close
+        together are handled by a single rebuild.
+        """
+        if self._pending_form_change is None:
+            self._pending_form_change = self.set_timer(
+                FORM_CHANGE_DELAY, self._apply_pending_form_change
+            )
+
+    def _apply_pending_form_change(self) -> None:
+        self._pending_form_change = None
         self._form_changed()
 
+    def flush_pending_changes(self) -> UserCommandData:
+        """Cancel any rebuild waiting on recent changes, and build the command data
+        from the current state of the form straight away.
+
+        No `Changed` message is posted, so the caller is responsible for using the
+        returned data.
+
+        Returns:
+            The command data for the form as it is now.
+        """
+        if self._pending_form_change is not None:
+            self._pending_form_change.stop()
+            self._pending_form_change = None
+        return self._build_command_data()
+
+    def refresh_command_data(self) -> None:
+        """Post a `Changed` message with the command data for the form as it is now,
+        e.g. when the form is shown again and the preview is out of date.
+
+        The message is posted via this form's message queue, so it comes from
+        the form (and bubbles all the way up to the app) whichever widget
+        calls this.
+        """
+        self.call_later(self._form_changed)
+
     def _form_changed(self) -> None:
         """Take the current state of the form and build a UserCommandData from it,
         then post a FormChanged message"""
+        self.post_message(self.Changed(self._build_command_data()))
 
+    def _build_command_data(self) -> UserCommandData:
+        """Build a UserCommandData from the current state of the form."""
         command_schema = self.command_schema
         path_from_root = command_schema.path_from_root
+        controls_by_key = self._controls_by_key
 
-        # Sentinel root value to make constructing the tree a little easier.
-        parent_command_data = UserCommandData(
-            name=CommandName("_"), options=[], arguments=[]
-        )
-
-        root_command_data = parent_command_data
+        # The path always starts at the root, so the first command's data is the root.
+        root_command_data: UserCommandData | None = None
+        parent_command_data: UserCommandData | None = None
         for command in path_from_root:
-            option_datas = []
             # For each of the options in the schema for this command,
             # lets grab the values the user has supplied for them in the form.
-            for option in command.options:
-                parameter_control = self.query_one(f"#{option.key}", ParameterControls)
-                value = parameter_control.get_values()
-                for v in value.values:
-                    assert isinstance(v, tuple)
-                    option_data = UserOptionData(option.name, v, option)
-                    option_datas.append(option_data)
-
-            # Now do the same for the arguments
-            argument_datas = []
-            for argument in command.arguments:
-                form_control_widget = self.query_one(
-                    f"#{argument.key}", ParameterControls
-                )
-                value = form_control_widget.get_values()
-                # This should only ever loop once since arguments can be multi-value but not multiple=True.
-                for v in value.values:
-                    assert isinstance(v, tuple)
-                    argument_data = UserArgumentData(argument.name, v, argument)
-                    argument_datas.append(argument_data)
-
-            assert all(isinstance(option.value, tuple) for option in option_datas)
-            assert all(isinstance(argument.value, tuple) for argument in argument_datas)
+            # The values are always tuples (see MultiValueParamData.process_cli_option).
+            option_datas = [
+                UserOptionData(option.name, value, option)
+                for option in command.options
+                for value in controls_by_key[option.key].get_values().values
+            ]
+
+            # Now do the same for the arguments. This should only ever give one value
+            # per argument, since arguments can be multi-value but not multiple=True.
+            argument_datas = [
+                UserArgumentData(argument.name, value, argument)
+                for argument in command.arguments
+                for value in controls_by_key[argument.key].get_values().values
+            ]
+
             command_data = UserCommandData(
                 name=command.name,
                 options=option_datas,
@@ -201,13 +335,14 @@ class CommandForm(Widget):
                 parent=parent_command_data,
                 command_schema=command,
             )
-            parent_command_data.subcommand = command_data
+            if parent_command_data is None:
+                root_command_data = command_data
+            else:
+                parent_command_data.subcommand = command_data
             parent_command_data = command_data
 
-        # Trim the sentinel
-        root_command_data = root_command_data.subcommand
-        root_command_data.parent = None
-        self.post_message(self.Changed(root_command_data))
+        assert root_command_data is not None
+        return root_command_data
 
     def focus(self, scroll_visible: bool = True):
         if self.first_control is not None:
@@ -215,8 +350,13 @@ class CommandForm(Widget):
 
     @on(Input.Changed, ".command-form-filter-input")
     def apply_filter(self, event: Input.Changed) -> None:
-        filter_query = event.value
-        all_controls = self.query(ParameterControls)
-        for control in all_controls:
-            filter_query = filter_query.casefold()
-            control.apply_filter(filter_query)
+        filter_query = event.value.casefold()
+        # Changes which don't affect the casefolded query (e.g. only the case of a
+        # letter changed) can't change which controls match.
+        if filter_query == self._last_filter_query:
+            return
+        self._last_filter_query = filter_query
+        # The same pattern highlights the query in every control's help text.
+        filter_pattern = compile_filter_pattern(filter_query) if filter_query else None
+        for control in self._controls_by_key.values():
+            control.apply_filter(filter_query, filter_pattern)
@@ -1,15 +1,15 @@
 from __future__ import annotations
 
 import functools
+import re
 from functools import partial
-from typing import Any, Callable, Iterable, Union, cast
+from typing import Any, Callable, ClassVar, Iterable, Pattern, Sequence, Union, cast
 
 import click
 from rich.text import Text
 from textual import on
 from textual.app import ComposeResult
 from textual.containers import Vertical, Horizontal
-from textual.css.query import NoMatches
 from textual.widget import Widget
 from textual.widgets import (
     Label,
@@ -34,19 +34,74 @@ class ControlGroupsContainer(Vertical):
     pass
 
 
-@functools.total_ordering
+def compile_filter_pattern(filter_query: str) -> Pattern[str]:
+    """Compile a pattern matching any of the words in a filter query, ignoring case.
+
+    Args:
+        filter_query: The query typed into a form's search box.
+
+    Returns:
+        A pattern used to highlight the query's words in help text.
+    """
+    return re.compile(
+        "|".join(re.escape(word) for word in filter_query.split()), re.IGNORECASE
+    )
+
+
 class ValueNotSupplied:
-    def __eq__(self, other):
-        return isinstance(other, ValueNotSupplied)
+    """Marks a parameter value the user hasn't filled in.
 
-    def __lt__(self, other):
-        return False
+    There's only ever one instance (`VALUE_NOT_SUPPLIED`), so it can be compared by
+    identity.
+    """
+
+    __slots__ = ()
+
+    _instance: ClassVar[ValueNotSupplied | None] = None
+
+    def __new__(cls) -> ValueNotSupplied:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
 
     def __bool__(self):
         return False
 
+    def __repr__(self) -> str:
+        return "ValueNotSupplied()"
+
+
+VALUE_NOT_SUPPLIED = ValueNotSupplied()
+
+
+def list_to_tuples(
+    lst: list[int | float | str], tuple_size: int
+) -> list[tuple[int | float | str, ...]]:
+    """Group a flat list of values into tuples of `tuple_size` values each."""
+    if tuple_size == 0:
+        return [tuple()]
+    elif tuple_size == 1 or tuple_size == -1:
+        # -1 is an unspecified number of arguments, as per the Click docs.
+        return [(value,) for value in lst]
+    return [tuple(lst[i : i + tuple_size]) for i in range(0, len(lst), tuple_size)]
+
 
 class ParameterControls(Widget):
+    _CONTROL_KINDS: ClassVar[dict[type, str]] = {
+        click.types.StringParamType: "text",
+        click.types.IntParamType: "text",
+        click.types.FloatParamType: "text",
+        click.types.UUIDParameterType: "text",
+        click.Path: "text",
+        click.File: "text",
+        click.IntRange: "text",
+        click.FloatRange: "text",
+        click.types.FuncParamType: "text",
+        click.types.BoolParamType: "checkbox",
+        click.Choice: "choice",
+    }
+    """The kind of control used for each of Click's parameter types."""
+
     def __init__(
         self,
         schema: ArgumentSchema | OptionSchema,
@@ -58,68 +113,110 @@ class ParameterControls(Widget):
         super().__init__(name=name, id=id, classes=classes, disabled=disabled)
         self.schema = schema
         self.first_control: Widget | None = None
+        self._help_static: Static | None = None
+        self._last_filter_result: tuple[str, bool] | None = None
+        # The widgets holding this parameter's values, in the order they appear.
+        self._value_widgets: list[ControlWidgetType] = []
+        # The values the widgets were composed with, to tell if the user changed them.
+        self._default_values: list[Any] = []
+
+        # These only depend on the schema, and are needed each time a widget group
+        # is made (including when the user adds another value).
+        parameter_type = schema.type
+        self._parameter_types: Sequence[click.ParamType] = (
+            parameter_type.types
+            if isinstance(parameter_type, click.Tuple)
+            else (parameter_type,)
+        )
+        self._label = self._make_command_form_control_label(
+            schema.name,
+            parameter_type,
+            isinstance(schema, OptionSchema),
+            schema.required,
+            schema.multiple,
+        )
 
-    def apply_filter(self, filter_query: str) -> bool:
+        # Filtering happens on every keystroke in the search box, so the strings
+        # it matches against are casefolded up front.
+        self._help_text = getattr(schema, "help", "") or ""
+        self._folded_help_text = self._help_text.casefold()
+        self._plain_help_text = Text(self._help_text)
+        self._help_text_highlighted = False
+        name = schema.name
+        self._folded_names: tuple[str, ...] = (
+            (name.casefold(),)
+            if isinstance(name, str)
+            else tuple(option_name.casefold() for option_name in name)
+        )
+
+    def apply_filter(
+        self, filter_query: str, filter_pattern: Pattern[str] | None = None
+    ) -> bool:
         """Show or hide this ParameterControls depending on whether it matches the filter query or not.
 
         Args:
-            filter_query: The string to filter on.
+            filter_query: The string to filter on, already casefolded.
+            filter_pattern: The query compiled with `compile_filter_pattern`, so
+                that it can be shared between controls. Compiled here if omitted.
 
         Returns:
             True if the filter matched (and the widget is visible).
         """
-        help_text = getattr(self.schema, "help", "") or ""
+        last_filter_result = self._last_filter_result
+        if last_filter_result is not None and last_filter_result[0] == filter_query:
+            return last_filter_result[1]
+
+        help_text = self._help_text
         if not filter_query:
             should_be_visible = True
             self.display = should_be_visible
         else:
-            name = self.schema.name
-            if isinstance(name, str):
-                # Argument names are strings, there's only one name
-                name_contains_query = filter_query in name.casefold()
+            # Options can have multiple names (e.g. -v and --verbose)
+            name_contains_query = any(
+                filter_query in name for name in self._folded_names
+            )
+            if isinstance(self.schema.name, str):
+                # Arguments are only matched on their name
                 should_be_visible = name_contains_query
             else:
-                # Option names are lists since they can have multiple names (e.g. -v and --verbose)
-                name_contains_query = any(
-                    filter_query in name.casefold() for name in self.schema.name
-                )
-                help_contains_query = filter_query in help_text.casefold()
+                help_contains_query = filter_query in self._folded_help_text
                 should_be_visible = name_contains_query or help_contains_query
 
             self.display = should_be_visible
 
-        # Update the highlighting of the help text
-        if help_text:
-            try:
-                help_label = self.query_one(".command-form-control-help-text", Static)
+        # Update the highlighting of the help text. With no query there's nothing
+        # to highlight, so the plain text only needs restoring if it was changed.
+        help_static = self._help_static
+        if help_static is not None:
+            if filter_query:
+                if filter_pattern is None:
+                    filter_pattern = compile_filter_pattern(filter_query)
                 new_help_text = Text(help_text)
-                new_help_text.highlight_words(
-                    filter_query.split(), "black on yellow", case_sensitive=False
-                )
-                help_label.update(new_help_text)
-            except NoMatches:
-                pass
-
+                new_help_text.highlight_regex(filter_pattern, "black on yellow")
+                help_static.update(new_help_text)
+                self._help_text_highlighted = True
+            elif self._help_text_highlighted:
+                help_static.update(self._plain_help_text)
+                self._help_text_highlighted = False
+
+        self._last_filter_result = (filter_query, should_be_visible)
         return should_be_visible
 
     def compose(self) -> ComposeResult:
         """Takes the schemas for each parameter of the current command, and converts it into a
         form consisting of Textual widgets."""
         schema = self.schema
-        name = schema.name
         argument_type = schema.type
         default = schema.default
-        help_text = getattr(schema, "help", "") or ""
+        help_text = self._help_text
         multiple = schema.multiple
-        is_option = isinstance(schema, OptionSchema)
         nargs = schema.nargs
-
-        label = self._make_command_form_control_label(
-            name, argument_type, is_option, schema.required, multiple=multiple
-        )
+        label = self._label
         first_focus_control: Widget | None = (
             None  # The widget that will be focused when the form is focused.
         )
+        # Each widget group has one widget per parameter type.
+        single_item = len(self._parameter_types) == 1
 
         # If there are N defaults, we render the "group" N times.
         # Each group will contain `nargs` widgets.
@@ -140,14 +237,15 @@ class ParameterControls(Widget):
                     schema=schema,
                     control_id=schema.key,
                 )
-                yield from multiple_choice_widget
+                for control_widget in multiple_choice_widget:
+                    self._value_widgets.append(control_widget)
+                    yield control_widget
             else:
                 # For other widgets, we'll render as normal...
                 # If required, we'll generate widgets containing the defaults
                 for default_value_tuple in default.values:
-                    widget_group = list(self.make_widget_group())
                     with ControlGroup() as control_group:
-                        if len(widget_group) == 1:
+                        if single_item:
                             control_group.add_class("single-item")
 
                         # Parameter types can be of length 1, but there could still
@@ -155,7 +253,7 @@ class ParameterControls(Widget):
                         # of those defaults. Extend the widget group such that
                         # there's a slot available for each default...
                         for default_value, control_widget in zip(
-                            default_value_tuple, widget_group
+                            default_value_tuple, self.make_widget_group()
                         ):
                             self._apply_default_value(control_widget, default_value)
                             yield control_widget
@@ -166,13 +264,12 @@ class ParameterControls(Widget):
                 # We always need to display the original group of controls,
                 # regardless of whether there are defaults
                 if multiple or not default.values:
-                    widget_group = list(self.make_widget_group())
                     with ControlGroup() as control_group:
-                        if len(widget_group) == 1:
+                        if single_item:
                             control_group.add_class("single-item")
 
                         # No need to apply defaults to this group
-                        for control_widget in widget_group:
+                        for control_widget in self.make_widget_group():
                             yield control_widget
                             if first_focus_control is None:
                                 first_focus_control = control_widget
@@ -190,36 +287,33 @@ class ParameterControls(Widget):
 
         # Render the dim help text below the form controls
         if help_text:
-            yield Static(help_text, classes="command-form-control-help-text")
+            self._help_static = Static(
+                help_text, classes="command-form-control-help-text"
+            )
+            yield self._help_static
+
+        get_form_control_value = self._get_form_control_value
+        self._default_values = [
+            get_form_control_value(control) for control in self._value_widgets
+        ]
 
     def make_widget_group(self) -> Iterable[ControlWidgetType]:
         """For this option, yield a single set of widgets required to receive user input for it."""
         schema = self.schema
         default = schema.default
-        parameter_type = schema.type
-        name = schema.name
         multiple = schema.multiple
-        required = schema.required
-        is_option = isinstance(schema, OptionSchema)
-        label = self._make_command_form_control_label(
-            name, parameter_type, is_option, required, multiple
-        )
+        label = self._label
 
-        # Get the types of the parameter. We can map these types on to widgets that will be rendered.
-        parameter_types = (
-            parameter_type.types
-            if isinstance(parameter_type, click.Tuple)
-            else [parameter_type]
-        )
-
-        # For each of the these parameters, render the corresponding widget for it.
+        # For each of the types of the parameter, render the corresponding widget for it.
         # At this point we don't care about filling in the default values.
-        for _type in parameter_types:
+        value_widgets = self._value_widgets
+        for _type in self._parameter_types:
             control_method = self.get_control_method(_type)
-            control_widgets = control_method(
+            for control_widget in control_method(
                 default, label, multiple, schema, schema.key
-            )
-            yield from control_widgets
+            ):
+                value_widgets.append(control_widget)
+                yield control_widget
 
     @on(Button.Pressed, ".add-another-button")
     def add_another_widget_group(self, event: Button.Pressed) -> None:
@@ -250,32 +344,19 @@ class ParameterControls(Widget):
             return control.selected
         elif isinstance(control, Select):
             if control.value is None or control.value is Select.BLANK:
-                return ValueNotSupplied()
+                return VALUE_NOT_SUPPLIED
             return control.value
         elif isinstance(control, Input):
             return (
-                ValueNotSupplied() if control.value == "" else control.value
+                VALUE_NOT_SUPPLIED if control.value == "" else control.value
             )  # TODO: We should only return "" when user selects a checkbox - needs custom widget.
         elif isinstance(control, Checkbox):
             return control.value
 
     def get_values(self) -> MultiValueParamData:
-        # We can find all relevant control widgets by querying the parameter schema
-        # key as a class.
-
-        def list_to_tuples(
-            lst: list[int | float | str], tuple_size: int
-        ) -> list[tuple[int | float | str, ...]]:
-            if tuple_size == 0:
-                return [tuple()]
-            elif tuple_size == -1:
-                # Unspecified number of arguments as per Click docs.
-                tuple_size = 1
-            return [
-                tuple(lst[i : i + tuple_size]) for i in range(0, len(lst), tuple_size)
-            ]
-
-        controls = list(self.query(f".{self.schema.key}"))
+        # The widgets are recorded as they're created, so there's no need to query
+        # the DOM for them each time the form changes.
+        controls = self._value_widgets
 
         if len(controls) == 1 and isinstance(controls[0], MultipleChoice):
             # Since MultipleChoice widgets are a special case that appear in
@@ -288,10 +369,8 @@ class ParameterControls(Widget):
             return MultiValueParamData.process_cli_option(control_values)
         else:
             # For each control widget for this parameter, capture the value(s) from them
-            collected_values = []
-            for control in list(controls):
-                control_values = self._get_form_control_value(control)
-                collected_values.append(control_values)
+            get_form_control_value = self._get_form_control_value
+            collected_values = [get_form_control_value(control) for control in controls]
 
             # Since we fetched a flat list of widgets (and thus a flat list of values
             # from those widgets), we now need to group them into tuples based on nargs.
@@ -306,32 +385,33 @@ class ParameterControls(Widget):
     ) -> Callable[
         [Any, Text, bool, OptionSchema | ArgumentSchema, str], ControlWidgetType
     ]:
-        text_click_types = {
-            click.STRING,
-            click.FLOAT,
-            click.INT,
-            click.UUID,
-        }
-        text_types = (
-            click.Path,
-            click.File,
-            click.IntRange,
-            click.FloatRange,
-            click.types.FuncParamType,
-        )
-
-        is_text_type = argument_type in text_click_types or isinstance(
-            argument_type, text_types
-        )
-        if is_text_type:
-            return self.make_text_control
-        elif argument_type == click.BOOL:
+        # Subclasses of Click's types (e.g. a custom Choice) get the same control as
+        # the nearest type they derive from. Anything else is entered as text.
+        control_kinds = self._CONTROL_KINDS
+        kind = "text"
+        for parameter_type in type(argument_type).__mro__:
+            if parameter_type in control_kinds:
+                kind = control_kinds[parameter_type]
+                break
+
+        if kind == "checkbox":
             return self.make_checkbox_control
-        elif isinstance(argument_type, click.types.Choice):
-            return partial(self.make_choice_control, choices=argument_type.choices)
+        elif kind == "choice":
+            return self._make_choice_control_method(argument_type)
         else:
             return self.make_text_control
 
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def _make_choice_control_method(
+        argument_type: click.Choice,
+    ) -> Callable[..., Iterable[ControlWidgetType]]:
+        # The same Choice is used for every widget group of a parameter (and by
+        # every form showing it), so the partial is built once per type.
+        return partial(
+            ParameterControls.make_choice_control, choices=argument_type.choices
+        )
+
     @staticmethod
     def make_text_control(
         default: Any,
@@ -357,7 +437,7 @@ class ParameterControls(Widget):
         if default.values:
             default = default.values[0][0]
         else:
-            default = ValueNotSupplied()
+            default = VALUE_NOT_SUPPLIED
 
         control = Checkbox(
             label,
@@ -426,3 +506,30 @@ class ParameterControls(Widget):
     def focus(self, scroll_visible: bool = True):
         if self.first_control is not None:
             self.first_control.focus()
+
+    def is_modified(self) -> bool:
+        """Check if the user has changed the values of this parameter.
+
+        Returns:
+            True if any value differs from its default, or values have been added.
+        """
+        value_widgets = self._value_widgets
+        default_values = self._default_values
+        if len(value_widgets) != len(default_values):
+            return True
+        get_form_control_value = self._get_form_control_value
+        return any(
+            get_form_control_value(control) != default_value
+            for control, default_value in zip(value_widgets, default_values)
+        )
+
+    async def reset(self) -> None:
+        """Restore the default values of this parameter, if the user has changed them."""
+        if not self.is_modified():
+            return
+        self.first_control = None
+        self._help_static = None
+        self._help_text_highlighted = False
+        self._last_filter_result = None
+        self._value_widgets.clear()
+        await self.recompose()